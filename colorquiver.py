@@ -20,11 +20,29 @@
 # DEALINGS IN THE SOFTWARE.                                                                  #
 #============================================================================================#
 
+from functools import lru_cache
 from typing import Iterable
 
 import numpy as np
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit, prange
+except ImportError: # numba is optional, fall back to the numpy implementation
+    njit = None
+
+try:
+    import numexpr as ne
+except ImportError: # numexpr is optional as well, used when the numba kernel is not
+    ne = None
+
+
+# below this many pixels the numba kernel's compile / cache load costs more than it saves
+_NUMBA_MIN_SIZE = 100_000
+
+# indices into (v, t, p, q) of the r, g, b components for each of the six hue sectors
+_HSV_TABLE = ((0, 1, 2), (3, 0, 2), (2, 0, 1), (2, 3, 0), (1, 2, 0), (0, 2, 3))
+
 
 def _hsv_to_rgb(h: float, s: float, v: float) -> tuple[float]:
     """ Exactly the same as colorsys.hsv_to_rgb """
@@ -35,36 +53,80 @@ def _hsv_to_rgb(h: float, s: float, v: float) -> tuple[float]:
     p = v * (1.0 - s)
     q = v * (1.0 - s * f)
     t = v * (1.0 - s * (1.0-f))
-    i = i % 6
-    if i == 0:
-        return v, t, p
-    if i == 1:
-        return q, v, p
-    if i == 2:
-        return p, v, t
-    if i == 3:
-        return p, q, v
-    if i == 4:
-        return t, p, v
-    if i == 5:
-        return v, p, q
-    # Cannot get here
+    vals = (v, t, p, q)
+    r, g, b = _HSV_TABLE[i % 6]
+    return vals[r], vals[g], vals[b]
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _hsv_to_rgb_kernel(h: np.ndarray, s: np.ndarray, v: np.ndarray, out: np.ndarray) -> None:
+        """ Single pass hsv_to_rgb over flattened arrays, writing the result into out[3, n]. """
+        for n in prange(h.shape[0]):
+            i = int(h[n] * 6.0)
+            f = (h[n] * 6.0) - i
+            p = v[n] * (1.0 - s[n])
+            q = v[n] * (1.0 - s[n] * f)
+            t = v[n] * (1.0 - s[n] * (1.0-f))
+            i = i % 6
+            if i == 0:
+                out[0, n], out[1, n], out[2, n] = v[n], t, p
+            elif i == 1:
+                out[0, n], out[1, n], out[2, n] = q, v[n], p
+            elif i == 2:
+                out[0, n], out[1, n], out[2, n] = p, v[n], t
+            elif i == 3:
+                out[0, n], out[1, n], out[2, n] = p, q, v[n]
+            elif i == 4:
+                out[0, n], out[1, n], out[2, n] = t, p, v[n]
+            else:
+                out[0, n], out[1, n], out[2, n] = v[n], p, q
 
 
 def _arr_hsv_to_rgb(h: np.ndarray, s: float | np.ndarray, v: float | np.ndarray) -> np.ndarray:
-    """ The hsv_to_rgb function that processes multiple inputs in a numpy array. """
-    i = (h * 6.0).astype(int)
-    f = (h * 6.0) - i
-    p = v * (1.0 - s)
-    q = v * (1.0 - s * f)
-    t = v * (1.0 - s * (1.0-f))
-    i = i % 6
-    return np.array([(mask := (i == 0)) * v, mask * t, mask * p]) \
-         + np.array([(mask := (i == 1)) * q, mask * v, mask * p]) \
-         + np.array([(mask := (i == 2)) * p, mask * v, mask * t]) \
-         + np.array([(mask := (i == 3)) * p, mask * q, mask * v]) \
-         + np.array([(mask := (i == 4)) * t, mask * p, mask * v]) \
-         + np.array([(mask := (i == 5)) * v, mask * p, mask * q])
+    """ The hsv_to_rgb function that processes multiple inputs in a numpy array.
+        The computation is done and returned in float32.
+    """
+    h = np.asarray(h, np.float32)
+    s = np.asarray(s, np.float32)
+    v = np.asarray(v, np.float32)
+    if njit is not None and h.size >= _NUMBA_MIN_SIZE:
+        rgb = np.empty((3, h.size), np.float32)
+        _hsv_to_rgb_kernel(
+            np.ascontiguousarray(h).ravel(),
+            np.ascontiguousarray(np.broadcast_to(s, h.shape)).ravel(),
+            np.ascontiguousarray(np.broadcast_to(v, h.shape)).ravel(),
+            rgb
+        )
+        return rgb.reshape((3,) + h.shape)
+
+    if ne is not None:
+        localDict = {
+            'h': h, 's': s, 'v': v,
+            'f': ne.evaluate("h*6 - floor(h*6)"),
+            'i': ne.evaluate("floor(h*6) % 6")
+        }
+        vals = ("v", "v*(1-s*(1-f))", "v*(1-s)", "v*(1-s*f)") # v, t, p, q
+        rgb = np.empty((3,) + h.shape, np.float32)
+        for k in range(3):
+            expr = vals[_HSV_TABLE[5][k]]
+            for sect in range(4, -1, -1):
+                expr = f"where(i=={sect}, {vals[_HSV_TABLE[sect][k]]}, {expr})"
+            ne.evaluate(expr, local_dict=localDict, out=rgb[k])
+        return rgb
+
+    i = np.floor(h * 6)
+    f = (h * 6) - i
+    p = v * (1 - s)
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1-f))
+    i = i.astype(np.intp) % 6
+
+    vals = (v, t, p, q)
+    rgb = np.empty((3,) + h.shape, np.float32)
+    for k in range(3):
+        np.choose(i, tuple(vals[sources[k]] for sources in _HSV_TABLE), out=rgb[k])
+    return rgb
 
 
 def _get_arg(vec: Iterable[float | np.ndarray]) -> float | np.ndarray:
@@ -73,7 +135,7 @@ def _get_arg(vec: Iterable[float | np.ndarray]) -> float | np.ndarray:
         e.g. `_getArg([1,  1]) == 0.125`
              `_getArg([1, -1]) == 0.875`
     """
-    return np.angle(-vec[0] - vec[1] * 1j) / 2 / np.pi + 0.5
+    return np.arctan2(-vec[1], -vec[0]) * (0.5 / np.pi) + 0.5
 
 
 def _vec_to_color(vec: Iterable[float], mapping: Iterable[float], mode: int = 1) -> Iterable[float]:
@@ -105,28 +167,52 @@ def _vec_to_color(vec: Iterable[float], mapping: Iterable[float], mode: int = 1)
         raise Exception(f"Color mode {mode} not surportted.")
 
 
-def _arr_vec_to_color(vec: Iterable[np.ndarray], mapping: Iterable[float], mode: int = 1) -> Iterable[float]:
+def _arr_vec_to_color(
+    vec: Iterable[np.ndarray],
+    mapping: Iterable[float],
+    mode: int = 1,
+    norm: np.ndarray | None = None,
+    arg: np.ndarray | None = None
+) -> Iterable[float]:
     """ The _vec_to_color function that processes multiple inputs in a numpy array.
         See more in `_vec_to_color()`.
+
+        The norms and arguments (see `_get_arg()`) of the vectors can be passed in through `norm`
+        and `arg` if they are already computed.
+        The colors are computed in float32, which is plenty for 8-bit display.
     """
-    norm = np.sqrt(vec[0]**2 + vec[1]**2)
+    vec = (np.asarray(vec[0], np.float32), np.asarray(vec[1], np.float32))
+    mapping = np.asarray(mapping, np.float32)
+    if norm is None:
+        norm = np.hypot(vec[0], vec[1])
+    else:
+        norm = np.asarray(norm, np.float32)
+    arg = _get_arg(vec) if arg is None else np.asarray(arg, np.float32)
     if mode == 1:
         return _arr_hsv_to_rgb(
-            _get_arg(vec),
+            arg,
             1,
             (norm - mapping[0]) / (mapping[1] - mapping[0])
         )
     elif mode == 2 or mode == 3:
         mapped = (norm - mapping[0]) / (mapping[1] - mapping[0])
         return _arr_hsv_to_rgb(
-            _get_arg(vec),
-            min(1, 2 - mapped * 2),
-            min(1, mapped * 2)
+            arg,
+            np.minimum(1, 2 - mapped * 2),
+            np.minimum(1, mapped * 2)
         )
     else:
         raise Exception(f"Color mode {mode} not surportted.")
 
 
+def _to_uint8_image(im: np.ndarray) -> np.ndarray:
+    """ Clip a (channel, height, width) float image to [0, 1] in place and return it as a
+        contiguous (height, width, channel) uint8 image, which imshow can use without converting.
+    """
+    np.clip(im, 0, 1, out=im)
+    return np.ascontiguousarray((im.transpose(1, 2, 0) * 255).astype(np.uint8))
+
+
 def colorquiver(
     ax: plt.Axes,
     rect: tuple,
@@ -160,21 +246,54 @@ def colorquiver(
 
     ma = 0
     maxValue = 0
+    norms = np.hypot(X, Y, dtype=np.float32)
 
     if mode == 1 or mode == 2:
-        ma = np.sqrt((X**2 + Y**2).max())
+        ma = float(norms.max())
     elif mode == 3:
-        norms = np.sqrt(X**2 + Y**2)
-        ma = norms.sum() / norms.size + norms.std()
-        maxValue = norms.max()
+        mean = norms.mean()
+        ma = float(mean + np.sqrt(np.square(norms - mean).mean()))
+        maxValue = float(norms.max())
     
-    im = _arr_vec_to_color(np.array([-X, Y]), [0, ma], mode)
+    # negate X while casting it to float32, so -X never exists as a separate float64 array
+    im = _arr_vec_to_color((np.negative(X, dtype=np.float32), Y), [0, ma], mode, norms)
 
-    ax.imshow(im.transpose(1, 2, 0), extent=rect)
+    ax.imshow(_to_uint8_image(im), extent=rect)
     
     return ma, maxValue
 
 
+@lru_cache(maxsize=8)
+def _wheel_grid(labelGrid: int) -> tuple[np.ndarray]:
+    """ Return the cell centers (Cx, Cy), and the argument, norm and alpha of each cell of the
+        color wheel. They do not depend on the color mode, so they are cached and shared by all
+        color modes as read-only arrays.
+    """
+    labelGridLen = 2 / labelGrid
+
+    centers = -1 + (np.arange(labelGrid, dtype=np.float32) + 0.5) * np.float32(labelGridLen)
+    Cx, Cy = np.meshgrid(centers, centers)
+    sqNorms = Cx*Cx + Cy*Cy
+    grid = (Cx, Cy, _get_arg((Cx, Cy)), np.sqrt(sqNorms), (sqNorms <= 1).astype(np.float32))
+    for arr in grid:
+        arr.flags.writeable = False
+    return grid
+
+
+@lru_cache(maxsize=8)
+def _build_wheel(labelGrid: int, colorMode: int) -> np.ndarray:
+    """ Return the RGBA image of the color wheel used by `colorlabel()`.
+
+        The result is cached and read-only, as it only depends on the arguments.
+    """
+    Cx, Cy, hue, norms, alpha = _wheel_grid(labelGrid)
+    rgb = _arr_vec_to_color((Cx, Cy), (0, 1), colorMode, norms, hue)
+    # cells outside the unit circle are hidden, clipping keeps them in range
+    rgba = _to_uint8_image(np.concatenate([rgb, alpha[None]]))
+    rgba.flags.writeable = False
+    return rgba
+
+
 def colorlabel(
     fig: plt.figure,
     labelGrid: int,
@@ -200,27 +319,8 @@ def colorlabel(
     ax2.axis([-1, 1, -1, 1])
     ax2.axis("off")
 
-    labelGridLen = 2 / labelGrid
-
-    for i in range(labelGrid):
-        for j in range(labelGrid):
-            labelGridRec = (
-                -1 + i * labelGridLen,
-                -1 + j * labelGridLen,
-                -1 + (i+1) * labelGridLen,
-                -1 + (j+1) * labelGridLen
-            )
-            labelGridCenter = np.array([
-                -1 + (i+0.5) * labelGridLen,
-                -1 + (j+0.5) * labelGridLen
-            ])
-            if np.linalg.norm(labelGridCenter) <= 1:
-                ax2.fill(
-                    [labelGridRec[0], labelGridRec[0], labelGridRec[2], labelGridRec[2]],
-                    [labelGridRec[1], labelGridRec[3], labelGridRec[3], labelGridRec[1]],
-                    color = _vec_to_color(labelGridCenter, (0, 1), colorMode),
-                    lw = 0
-                )
+    rgba = _build_wheel(labelGrid, colorMode)
+    ax2.imshow(rgba, extent=[-1, 1, -1, 1], origin="lower", aspect="auto", interpolation="nearest")
 
     offsetX = 0.1
     offsetY = -0.15
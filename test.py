@@ -32,9 +32,11 @@ ax = fig.add_axes((0.1, 0.1, 0.8, 0.8), facecolor="#EEE")
 shape = (100, 100)
 X, Y = np.meshgrid(np.linspace(lim[0], lim[1], shape[1]), np.linspace(lim[2], lim[3], shape[0]))
 
-l = np.sqrt(X**2 + Y**2)
-U = -Y / l
-V = X / l
+l = np.hypot(X, Y)
+U = np.negative(Y)
+V = np.empty_like(X)
+np.divide(U, l, out=U)
+np.divide(X, l, out=V)
 
 mapping[1], maxValue = colorquiver.colorquiver(ax, lim, U, V, colorMode)
 